@@ -2,20 +2,102 @@
 FastAPI backend for PDF image extraction
 Extracts images from PDF files and converts them to WebP format
 """
+import itertools
+import logging
+import multiprocessing
 import os
 import tempfile
-import base64
-from pathlib import Path
-from typing import List, Dict
+import threading
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager, closing
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import anyio
+import orjson
 import uvicorn
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, UploadFile, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, StreamingResponse
 import fitz  # PyMuPDF
+import pybase64
 from PIL import Image
 import io
 
-app = FastAPI(title="PDF Image Extractor")
+logger = logging.getLogger(__name__)
+
+# Guards creating app.state.process_pool on first use and dropping it after a worker crash
+_process_pool_lock = threading.Lock()
+
+# ProcessPoolExecutor rejects more than 61 workers on Windows
+PROCESS_POOL_WORKERS = min(os.cpu_count() or 1, 61)
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    """
+    Return the worker process pool used for very large PDFs, creating it on first use.
+    """
+    with _process_pool_lock:
+        if app.state.process_pool is None:
+            # forkserver keeps workers from inheriting the server's threads; Windows only has spawn
+            start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            app.state.process_pool = ProcessPoolExecutor(
+                max_workers=PROCESS_POOL_WORKERS,
+                mp_context=multiprocessing.get_context(start_method),
+            )
+        return app.state.process_pool
+
+
+def _replace_broken_process_pool(broken_pool: Executor) -> None:
+    """
+    Drop the process pool after a worker died so the next large PDF creates a fresh one.
+    """
+    with _process_pool_lock:
+        if app.state.process_pool is broken_pool:
+            app.state.process_pool = None
+    broken_pool.shutdown(wait=False)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Create one process-wide thread pool for image encoding, shared by all requests.
+    Pillow and libwebp release the GIL while encoding, so threads scale across cores.
+    Very large PDFs are split across a process pool instead (see MULTIPROCESS_MIN_PAGES),
+    which is only started once such a PDF arrives.
+    """
+    app.state.encode_pool = ThreadPoolExecutor(max_workers=os.cpu_count())
+    app.state.process_pool = None
+    yield
+    app.state.encode_pool.shutdown()
+    if app.state.process_pool is not None:
+        app.state.process_pool.shutdown()
+
+
+# orjson serializes the long base64 strings much faster than the stdlib encoder
+app = FastAPI(
+    title="PDF Image Extractor",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
+)
+
+# With keepOriginal, embedded JPEG/PNG images below this size are returned as-is instead of re-encoded to WebP
+PASSTHROUGH_MAX_BYTES = 200 * 1024
+PASSTHROUGH_MIME_TYPES = {"jpeg": "image/jpeg", "jpg": "image/jpeg", "png": "image/png"}
+
+# Embedded image formats Pillow cannot decode; these are skipped instead of failing per image
+UNSUPPORTED_IMAGE_EXTENSIONS = {"jb2", "jbig2"}
+
+# PyMuPDF reports the number of colour components; 4 means CMYK
+CMYK_COLORSPACE = 4
+
+# PDFs with at least this many pages are split into page ranges across worker processes
+MULTIPROCESS_MIN_PAGES = 200
+PAGES_PER_PROCESS_CHUNK = 50
+
+# Default WebP encoder settings (method 4 is much faster than 6 at nearly the same size)
+DEFAULT_WEBP_QUALITY = 85
+DEFAULT_WEBP_METHOD = 4
 
 # Configure CORS
 app.add_middleware(
@@ -27,135 +109,494 @@ app.add_middleware(
 )
 
 
-def extract_images_from_pdf(pdf_path: str) -> List[Dict[str, any]]:
+def _flatten_alpha(img: Image.Image) -> Image.Image:
     """
-    Extract embedded images from PDF and convert to WebP format.
-    Returns a list of dictionaries with page number, image index, and base64-encoded WebP image.
+    Composite an RGBA image onto a white background.
     """
-    images = []
-    image_index = 0
-    seen_xrefs = set()  # Track extracted images to avoid duplicates
+    rgb_img = Image.new("RGB", img.size, (255, 255, 255))
+    rgb_img.paste(img, mask=img.getchannel("A"))  # Use alpha channel as mask
+    return rgb_img
+
+
+def _convert_to_rgb(img: Image.Image) -> Image.Image:
+    return img.convert("RGB")
+
+
+# PyMuPDF does not support multithreaded use, even on separate documents
+_fitz_lock = threading.Lock()
+
+# (pdf_path, document) opened by this worker process; see _get_worker_document
+_worker_document = (None, None)
+
+# Per-thread scratch state for _encode_one
+_thread_local = threading.local()
+
+# Modes that must be converted before a LANCZOS downsample (bilevel scans, palette images)
+_RESAMPLE_MODES = {"1": "L", "P": "RGB"}
+
+# Per-mode normalization before WebP encoding; modes not listed (P, CMYK, ...) go to RGB
+_MODE_NORMALIZERS = {
+    "RGBA": _flatten_alpha,
+    "RGB": lambda img: img,
+    "L": lambda img: img,
+}
+
+
+def _encode_one(
+    image_bytes: bytes,
+    passthrough_mime: Optional[str] = None,
+    is_cmyk: bool = False,
+    quality: int = DEFAULT_WEBP_QUALITY,
+    method: int = DEFAULT_WEBP_METHOD,
+    max_dim: Optional[int] = None,
+) -> str:
+    """
+    Convert raw embedded image bytes to a base64 WebP data URL.
+    If passthrough_mime is given, the original bytes are encoded without re-encoding.
+    CMYK images are converted to RGB directly, skipping the mode checks.
+    If max_dim is given, larger images are downsampled to fit within max_dim x max_dim.
+    """
+    if passthrough_mime:
+        return f"data:{passthrough_mime};base64,{pybase64.b64encode_as_string(image_bytes)}"
+    
+    # Open image with PIL
+    img_pil = Image.open(io.BytesIO(image_bytes))
+    
+    # Downsample early so conversion and encoding work on fewer pixels
+    if max_dim and (img_pil.width > max_dim or img_pil.height > max_dim):
+        # Pillow forces NEAREST resampling for these modes, so convert them first
+        if img_pil.mode in _RESAMPLE_MODES:
+            img_pil = img_pil.convert(_RESAMPLE_MODES[img_pil.mode])
+        img_pil.thumbnail((max_dim, max_dim), Image.Resampling.LANCZOS)
+    
+    # Normalize to RGB/L (WebP supports alpha, but RGB is smaller)
+    if is_cmyk:
+        img_pil = img_pil.convert("RGB")
+    else:
+        img_pil = _MODE_NORMALIZERS.get(img_pil.mode, _convert_to_rgb)(img_pil)
+    
+    # Convert to WebP
+    # Reuse this worker thread's output buffer instead of allocating one per image
+    webp_buffer = getattr(_thread_local, "webp_buffer", None)
+    if webp_buffer is None:
+        webp_buffer = _thread_local.webp_buffer = io.BytesIO()
+    # Overwrite from the start and truncate afterwards: truncating first would shrink the
+    # allocation to nothing, while truncating at the end keeps it unless the new image is
+    # under half the previous size
+    webp_buffer.seek(0)
+    img_pil.save(webp_buffer, format="WEBP", quality=quality, method=method)
+    webp_buffer.truncate()
+    
+    # Encode to base64 straight from the buffer's memoryview (no bytes copy)
+    # The view must be released before the buffer can be truncated for the next image
+    with webp_buffer.getbuffer() as webp_view:
+        webp_base64 = pybase64.b64encode_as_string(webp_view)
+    return f"data:image/webp;base64,{webp_base64}"
+
+
+def collect_page_images(pdf_document) -> List[list]:
+    """
+    Return each page's embedded image list, in page order.
+    """
+    # get_images(full=True) returns embedded image objects, NOT page renders
+    # This extracts actual image files embedded in the PDF (photos, logos, etc.)
+    # NOT the rendered appearance of the page
+    return [pdf_document[page_num].get_images(full=True) for page_num in range(len(pdf_document))]
+
+
+def collect_image_xrefs(page_images: List[list]) -> Dict[int, Tuple[int, int]]:
+    """
+    Map each unique image xref to the (page_num, img_index) where it first appears.
+    Takes the per-page image lists from collect_page_images(). Insertion order follows page order.
+    """
+    xref_to_page = {}
+    
+    for page_num, image_list in enumerate(page_images):
+        for img_index, img_info in enumerate(image_list):
+            # img_info[0] is the image xref (image reference number)
+            xref_to_page.setdefault(img_info[0], (page_num, img_index))
+    
+    return xref_to_page
+
+
+def _prepare_image(
+    base_image: Dict[str, any],
+    page_num: int,
+    img_index: int,
+    max_dim: Optional[int] = None,
+    keep_original: bool = False,
+) -> Optional[Tuple[bytes, Optional[str], bool]]:
+    """
+    Apply the cheap metadata checks to an image returned by extract_image().
+    If keep_original is set, small JPEG/PNG images are marked for passthrough instead of WebP.
+    Returns (image_bytes, passthrough_mime, is_cmyk), or None if the image should be skipped.
+    """
+    image_bytes = base_image["image"]
+    
+    # Cheap rejections using PyMuPDF's metadata, before PIL decodes anything
+    # Skip if image is too small (likely not a real embedded image)
+    if len(image_bytes) < 100:  # Less than 100 bytes is suspiciously small
+        return None
+    
+    # Skip very small images (likely icons or decorative elements)
+    if base_image.get("width", 0) < 10 or base_image.get("height", 0) < 10:
+        return None
+    
+    # Skip formats PIL can't open (e.g. JBIG2) rather than raising per image
+    image_ext = base_image["ext"]
+    if image_ext in UNSUPPORTED_IMAGE_EXTENSIONS:
+        logger.info("Skipping unsupported %s image %d on page %d", image_ext, img_index, page_num + 1)
+        return None
+    
+    is_cmyk = base_image.get("colorspace") == CMYK_COLORSPACE
+    
+    # Small JPEG/PNG images are already compact; skip the decode + WebP encode
+    # CMYK JPEGs are always converted, since browsers render them inconsistently
+    # Images that need downsampling always go through the encoder
+    fits_max_dim = not max_dim or (
+        base_image["width"] <= max_dim and base_image["height"] <= max_dim
+    )
+    passthrough_mime = None
+    if keep_original and len(image_bytes) < PASSTHROUGH_MAX_BYTES and not is_cmyk and fits_max_dim:
+        passthrough_mime = PASSTHROUGH_MIME_TYPES.get(image_ext)
+    
+    return image_bytes, passthrough_mime, is_cmyk
+
+
+def _submit_in_order(executor: Executor, tasks: Iterable[tuple], max_in_flight: int) -> Iterator[tuple]:
+    """
+    Submit (tag, fn, *args) tasks with at most max_in_flight outstanding at once.
+    Yields (tag, future) in submission order; queued futures are cancelled if iteration stops early.
+    """
+    tasks = iter(tasks)
+    in_flight = deque()
     
     try:
-        # Open PDF with PyMuPDF
+        while True:
+            while len(in_flight) < max_in_flight:
+                task = next(tasks, None)
+                if task is None:
+                    break
+                tag, fn, *args = task
+                in_flight.append((tag, executor.submit(fn, *args)))
+            
+            if not in_flight:
+                return
+            
+            yield in_flight.popleft()
+    finally:
+        # Don't leave queued work on the shared pools if the client disconnects
+        for _, future in in_flight:
+            future.cancel()
+
+
+def _extract_and_encode(
+    pdf_document,
+    xref_to_page: Dict[int, Tuple[int, int]],
+    executor: Executor,
+    quality: int,
+    method: int,
+    max_dim: Optional[int],
+    keep_original: bool,
+) -> Iterator[Tuple[int, str]]:
+    """
+    Extract each unique image and encode it on the thread pool, yielding (page_num, data_url) in page order.
+    Extraction is interleaved with encoding, so only a bounded number of raw images is held at once.
+    Takes ownership of pdf_document and closes it when done.
+    """
+    def tasks():
+        for xref, (page_num, img_index) in xref_to_page.items():
+            try:
+                # Only the extract_image() call itself needs the fitz lock
+                with _fitz_lock:
+                    base_image = pdf_document.extract_image(xref)
+                prepared = _prepare_image(base_image, page_num, img_index, max_dim, keep_original)
+            except Exception as e:
+                # Skip images that can't be processed
+                logger.warning("Could not extract image %d from page %d: %s", img_index, page_num + 1, e)
+                continue
+            
+            if prepared is None:
+                continue
+            
+            yield ((page_num, img_index), _encode_one, *prepared, quality, method, max_dim)
+    
+    try:
+        # Only keep a bounded number of images in flight so output is
+        # streamed instead of accumulating every image in memory
+        for (page_num, img_index), future in _submit_in_order(executor, tasks(), 2 * (os.cpu_count() or 1)):
+            try:
+                data_url = future.result()
+            except Exception as e:
+                # Skip images that can't be processed
+                logger.warning("Could not extract image %d from page %d: %s", img_index, page_num + 1, e)
+                continue
+            
+            yield page_num, data_url
+    finally:
+        with _fitz_lock:
+            pdf_document.close()
+
+
+def _get_worker_document(pdf_path: str):
+    """
+    Return this worker process's document handle for pdf_path, opening it on first use.
+    Each worker keeps one open document, so a PDF is parsed once per worker rather than once per batch.
+    """
+    global _worker_document
+    
+    cached_path, pdf_document = _worker_document
+    if cached_path != pdf_path:
+        # A batch from a different upload; the previous document is no longer needed here
+        if pdf_document is not None:
+            pdf_document.close()
         pdf_document = fitz.open(pdf_path)
-        
-        for page_num in range(len(pdf_document)):
-            page = pdf_document[page_num]
+        _worker_document = (pdf_path, pdf_document)
+    
+    return pdf_document
+
+
+def _extract_image_batch(
+    pdf_path: str,
+    batch: List[Tuple[int, int, int]],
+    quality: int,
+    method: int,
+    max_dim: Optional[int],
+    keep_original: bool,
+) -> List[Tuple[int, str]]:
+    """
+    Worker-process entry point: extract and encode the (xref, page_num, img_index) images in batch.
+    Returns (page_num, data_url) in order.
+    """
+    results = []
+    pdf_document = _get_worker_document(pdf_path)
+    
+    for xref, page_num, img_index in batch:
+        try:
+            prepared = _prepare_image(
+                pdf_document.extract_image(xref), page_num, img_index, max_dim, keep_original
+            )
+            if prepared is None:
+                continue
             
-            # Get list of images embedded in this page
-            # get_images(full=True) returns embedded image objects, NOT page renders
-            # This extracts actual image files embedded in the PDF (photos, logos, etc.)
-            # NOT the rendered appearance of the page
-            image_list = page.get_images(full=True)
+            image_bytes, passthrough_mime, is_cmyk = prepared
+            data_url = _encode_one(image_bytes, passthrough_mime, is_cmyk, quality, method, max_dim)
+            results.append((page_num, data_url))
+        except Exception as e:
+            # Skip images that can't be processed
+            logger.warning("Could not extract image %d from page %d: %s", img_index, page_num + 1, e)
+            continue
+    
+    return results
+
+
+def _encode_page_ranges(
+    process_pool: Executor,
+    pdf_bytes: bytes,
+    xref_to_page: Dict[int, Tuple[int, int]],
+    quality: int,
+    method: int,
+    max_dim: Optional[int],
+    keep_original: bool,
+) -> Iterator[Tuple[int, str]]:
+    """
+    Fan images out to worker processes in page-range batches, yielding (page_num, data_url) in page order.
+    Each unique xref is assigned to the range of the first page it appears on, so shared images
+    (logos, watermarks) are only extracted and encoded once.
+    """
+    batches = {}
+    for xref, (page_num, img_index) in xref_to_page.items():
+        batches.setdefault(page_num // PAGES_PER_PROCESS_CHUNK, []).append((xref, page_num, img_index))
+    
+    # Workers open the PDF from a file, so the bytes are written once instead of pickled per batch
+    fd, pdf_path = tempfile.mkstemp(suffix=".pdf")
+    try:
+        with os.fdopen(fd, "wb") as pdf_file:
+            pdf_file.write(pdf_bytes)
+        
+        tasks = (
+            ((batch[0][1], batch[-1][1]), _extract_image_batch, pdf_path, batch, quality, method, max_dim, keep_original)
+            for batch in batches.values()
+        )
+        
+        for (first_page, last_page), future in _submit_in_order(process_pool, tasks, PROCESS_POOL_WORKERS):
+            try:
+                results = future.result()
+            except BrokenProcessPool:
+                raise
+            except Exception as e:
+                # Fail the request rather than silently dropping a page range
+                raise Exception(f"Could not extract images from pages {first_page + 1}-{last_page + 1}: {str(e)}")
             
-            if not image_list:
-                continue  # Skip pages with no images
+            yield from results
+    except BrokenProcessPool:
+        # A worker died (e.g. crash or OOM kill); the pool can't be reused
+        _replace_broken_process_pool(process_pool)
+        raise Exception("A worker process crashed while extracting images from this PDF.")
+    finally:
+        # Workers may still hold the file open (cancelled request, cached handle); on Windows
+        # that makes unlink fail, which must not hide the original error
+        try:
+            os.unlink(pdf_path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning("Could not remove temporary file %s: %s", pdf_path, e)
+
+
+def extract_images_from_pdf(
+    pdf_bytes: bytes,
+    executor: Executor,
+    quality: int = DEFAULT_WEBP_QUALITY,
+    method: int = DEFAULT_WEBP_METHOD,
+    max_dim: Optional[int] = None,
+    get_process_pool: Optional[Callable[[], Executor]] = None,
+    keep_original: bool = False,
+) -> Iterator[Dict[str, any]]:
+    """
+    Extract embedded images from PDF and convert to WebP format.
+    Images are encoded on the given executor; quality and method are passed through to the WebP encoder.
+    If max_dim is given, images are downsampled to fit within max_dim x max_dim.
+    If keep_original is set, small JPEG/PNG images are returned unconverted.
+    PDFs with at least MULTIPROCESS_MIN_PAGES pages are split across the pool returned by
+    get_process_pool, if given; it is only called for such PDFs.
+    Yields dictionaries with page number, image index, and base64-encoded WebP image.
+    """
+    image_index = 0
+    
+    try:
+        # MuPDF's global context is shared between documents, so fitz calls are serialized
+        with _fitz_lock:
+            # Open PDF with PyMuPDF straight from memory
+            pdf_document = fitz.open(stream=pdf_bytes, filetype="pdf")
+            try:
+                use_processes = get_process_pool is not None and len(pdf_document) >= MULTIPROCESS_MIN_PAGES
+                
+                # First pass: map each unique xref to the first page (and position) that uses it,
+                # so images repeated across pages (logos, watermarks) are only extracted once
+                xref_to_page = collect_image_xrefs(collect_page_images(pdf_document))
+            except Exception:
+                pdf_document.close()
+                raise
             
-            for img_index, img_info in enumerate(image_list):
-                try:
-                    # Get image by xref (image reference number)
-                    xref = img_info[0]
-                    
-                    # Skip if we've already extracted this image (can appear on multiple pages)
-                    if xref in seen_xrefs:
-                        continue
-                    
-                    seen_xrefs.add(xref)
-                    
-                    # Extract the actual image data
-                    base_image = pdf_document.extract_image(xref)
-                    image_bytes = base_image["image"]
-                    image_ext = base_image["ext"]
-                    
-                    # Skip if image is too small (likely not a real embedded image)
-                    if len(image_bytes) < 100:  # Less than 100 bytes is suspiciously small
-                        continue
-                    
-                    # Open image with PIL
-                    img_pil = Image.open(io.BytesIO(image_bytes))
-                    
-                    # Skip very small images (likely icons or decorative elements)
-                    if img_pil.width < 10 or img_pil.height < 10:
-                        continue
-                    
-                    # Convert RGBA to RGB if necessary (WebP supports both, but RGB is smaller)
-                    if img_pil.mode == "RGBA":
-                        # Create white background for transparency
-                        rgb_img = Image.new("RGB", img_pil.size, (255, 255, 255))
-                        rgb_img.paste(img_pil, mask=img_pil.split()[3])  # Use alpha channel as mask
-                        img_pil = rgb_img
-                    elif img_pil.mode == "P":  # Palette mode
-                        img_pil = img_pil.convert("RGB")
-                    elif img_pil.mode not in ("RGB", "L"):
-                        img_pil = img_pil.convert("RGB")
-                    
-                    # Convert to WebP
-                    webp_buffer = io.BytesIO()
-                    img_pil.save(webp_buffer, format="WEBP", quality=85, method=6)
-                    webp_buffer.seek(0)
-                    
-                    # Encode to base64
-                    webp_base64 = base64.b64encode(webp_buffer.read()).decode('utf-8')
-                    data_url = f"data:image/webp;base64,{webp_base64}"
-                    
-                    image_index += 1
-                    images.append({
-                        "pageNumber": page_num + 1,
-                        "imageIndex": image_index,
-                        "url": data_url
-                    })
-                except Exception as e:
-                    # Skip images that can't be processed
-                    print(f"Warning: Could not extract image {img_index} from page {page_num + 1}: {str(e)}")
-                    continue
+            if use_processes:
+                pdf_document.close()
         
-        pdf_document.close()
+        if use_processes:
+            # Very large PDFs: each worker process opens its own handle and extracts one page range
+            encoded = _encode_page_ranges(
+                get_process_pool(), pdf_bytes, xref_to_page, quality, method, max_dim, keep_original
+            )
+        else:
+            # Second pass: extract each unique image exactly once, encoding as we go
+            encoded = _extract_and_encode(
+                pdf_document, xref_to_page, executor, quality, method, max_dim, keep_original
+            )
         
     except Exception as e:
         raise Exception(f"Error processing PDF: {str(e)}")
     
-    if not images:
+    with closing(encoded):
+        for page_num, data_url in encoded:
+            image_index += 1
+            yield {
+                "pageNumber": page_num + 1,
+                "imageIndex": image_index,
+                "url": data_url
+            }
+    
+    if image_index == 0:
         raise Exception("No embedded images found in this PDF. The PDF may only contain text or vector graphics.")
+
+
+def inspect_pdf_images(pdf_bytes: bytes) -> Dict[str, any]:
+    """
+    Collect per-page information about the images embedded in a PDF.
+    """
+    # MuPDF's global context is shared between documents, so fitz calls are serialized
+    with _fitz_lock:
+        pdf_document = fitz.open(stream=pdf_bytes, filetype="pdf")
+        try:
+            debug_info = {
+                "totalPages": len(pdf_document),
+                "pages": []
+            }
+            
+            # Load each page's image list once and reuse it for both passes
+            page_images = collect_page_images(pdf_document)
+            
+            # Extract each unique xref once; the same image may be listed on many pages
+            image_details = {}
+            for xref in collect_image_xrefs(page_images):
+                try:
+                    base_image = pdf_document.extract_image(xref)
+                    image_details[xref] = {
+                        "xref": xref,
+                        "ext": base_image["ext"],
+                        "size": len(base_image["image"]),
+                        "width": base_image.get("width", "unknown"),
+                        "height": base_image.get("height", "unknown"),
+                    }
+                except:
+                    pass
+            
+            for page_num, image_list in enumerate(page_images):
+                page_info = {
+                    "pageNumber": page_num + 1,
+                    "imageCount": len(image_list),
+                    "images": [
+                        image_details[img_info[0]]
+                        for img_info in image_list
+                        if img_info[0] in image_details
+                    ]
+                }
+                
+                debug_info["pages"].append(page_info)
+        finally:
+            pdf_document.close()
     
-    return images
+    return debug_info
 
 
 @app.post("/api/extract-images")
-async def extract_images(file: UploadFile = File(...)):
+async def extract_images(
+    file: UploadFile = File(...),
+    quality: int = Query(DEFAULT_WEBP_QUALITY, ge=0, le=100),
+    method: int = Query(DEFAULT_WEBP_METHOD, ge=0, le=6),
+    max_dim: Optional[int] = Query(None, ge=1, alias="maxDimension"),
+    keep_original: bool = Query(False, alias="keepOriginal"),
+):
     """
     Extract embedded images from uploaded PDF file.
-    Returns JSON with list of extracted images in WebP format.
+    Streams newline-delimited JSON, one extracted WebP image per line.
+    quality and method control the WebP encoder (higher method is slower but smaller).
+    maxDimension downsamples images so neither side exceeds it.
+    keepOriginal returns small embedded JPEG/PNG images unconverted instead of as WebP.
     """
     # Validate file type
     if not file.content_type or file.content_type != "application/pdf":
         raise HTTPException(status_code=400, detail="File must be a PDF")
     
-    # Create temporary file
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-        try:
-            # Save uploaded file to temporary location
-            content = await file.read()
-            tmp_file.write(content)
-            tmp_file_path = tmp_file.name
-            
-            # Extract images
-            images = extract_images_from_pdf(tmp_file_path)
-            
-            return JSONResponse(content={
-                "success": True,
-                "images": images,
-                "totalImages": len(images)
-            })
-            
-        except Exception as e:
-            error_message = str(e)
-            status_code = 400 if "No embedded images found" in error_message else 500
-            raise HTTPException(status_code=status_code, detail=error_message)
-        finally:
-            # Clean up temporary file
-            if os.path.exists(tmp_file_path):
-                os.unlink(tmp_file_path)
+    try:
+        content = await file.read()
+        
+        # Pull the first image in a worker thread before responding, so errors such as
+        # "no images" still map to an HTTP status
+        images = extract_images_from_pdf(
+            content, app.state.encode_pool, quality, method, max_dim, _get_process_pool, keep_original
+        )
+        first_image = await anyio.to_thread.run_sync(next, images)
+        
+        # Stream one JSON object per line; Starlette iterates sync generators in its threadpool
+        return StreamingResponse(
+            (orjson.dumps(image) + b"\n" for image in itertools.chain([first_image], images)),
+            media_type="application/x-ndjson",
+        )
+        
+    except Exception as e:
+        error_message = str(e)
+        status_code = 400 if "No embedded images found" in error_message else 500
+        raise HTTPException(status_code=status_code, detail=error_message)
 
 
 @app.get("/health")
@@ -172,53 +613,15 @@ async def debug_pdf(file: UploadFile = File(...)):
     if not file.content_type or file.content_type != "application/pdf":
         raise HTTPException(status_code=400, detail="File must be a PDF")
     
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-        try:
-            content = await file.read()
-            tmp_file.write(content)
-            tmp_file_path = tmp_file.name
-            
-            pdf_document = fitz.open(tmp_file_path)
-            debug_info = {
-                "totalPages": len(pdf_document),
-                "pages": []
-            }
-            
-            for page_num in range(len(pdf_document)):
-                page = pdf_document[page_num]
-                image_list = page.get_images(full=True)
-                page_info = {
-                    "pageNumber": page_num + 1,
-                    "imageCount": len(image_list),
-                    "images": []
-                }
-                
-                for img_info in image_list:
-                    xref = img_info[0]
-                    try:
-                        base_image = pdf_document.extract_image(xref)
-                        page_info["images"].append({
-                            "xref": xref,
-                            "ext": base_image["ext"],
-                            "size": len(base_image["image"]),
-                            "width": base_image.get("width", "unknown"),
-                            "height": base_image.get("height", "unknown"),
-                        })
-                    except:
-                        pass
-                
-                debug_info["pages"].append(page_info)
-            
-            pdf_document.close()
-            return JSONResponse(content=debug_info)
-            
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
-        finally:
-            if os.path.exists(tmp_file_path):
-                os.unlink(tmp_file_path)
+    try:
+        content = await file.read()
+        
+        debug_info = await anyio.to_thread.run_sync(inspect_pdf_images, content)
+        return ORJSONResponse(content=debug_info)
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
-
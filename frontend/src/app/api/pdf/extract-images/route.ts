@@ -39,8 +39,10 @@ export async function POST(request: NextRequest) {
       );
     }
 
-    const data = await response.json();
-    return NextResponse.json(data);
+    // Pass the NDJSON stream through so images reach the client as they are encoded
+    return new Response(response.body, {
+      headers: { 'Content-Type': 'application/x-ndjson' },
+    });
   } catch (error) {
     console.error('Error processing PDF:', error);
     return NextResponse.json(
@@ -17,6 +17,13 @@ type GeneratedImage = {
   url: string;
 };
 
+// Small JPEG/PNG images are passed through by the backend without WebP conversion
+function getImageExtension(url: string) {
+  const match = /^data:image\/([a-z]+);/i.exec(url);
+  if (!match) return "webp";
+  return match[1].toLowerCase() === "jpeg" ? "jpg" : match[1].toLowerCase();
+}
+
 export function PdfToWebpTool() {
   const [isProcessing, setIsProcessing] = useState(false);
   const [error, setError] = useState<string | null>(null);
@@ -49,13 +56,31 @@ export function PdfToWebpTool() {
         throw new Error(errorData.error || "Failed to process PDF");
       }
 
-      const data = await response.json();
-
-      if (data.success && data.images) {
-        setImages(data.images);
-      } else {
+      if (!response.body) {
         throw new Error("Invalid response from server");
       }
+
+      // The backend streams one JSON image per line; show each as it arrives
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffered = "";
+
+      while (true) {
+        const { done, value } = await reader.read();
+        buffered += decoder.decode(value, { stream: !done });
+
+        const lines = buffered.split("\n");
+        buffered = done ? "" : lines.pop() ?? "";
+
+        const batch = lines
+          .filter((line) => line.trim())
+          .map((line) => JSON.parse(line) as GeneratedImage);
+        if (batch.length > 0) {
+          setImages((prev) => [...prev, ...batch]);
+        }
+
+        if (done) break;
+      }
     } catch (err) {
       console.error(err);
       setError(
@@ -87,7 +112,7 @@ export function PdfToWebpTool() {
       if (isBase64) {
         const fileName = `page-${img.pageNumber}-image-${
           img.imageIndex || img.pageNumber
-        }.webp`;
+        }.${getImageExtension(img.url)}`;
         zip.file(fileName, data, { base64: true });
       }
     }
@@ -184,7 +209,7 @@ export function PdfToWebpTool() {
                       href={img.url}
                       download={`page-${img.pageNumber}-image-${
                         img.imageIndex || img.pageNumber
-                      }.webp`}
+                      }.${getImageExtension(img.url)}`}
                       className="font-medium text-blue-600 hover:underline dark:text-blue-400"
                     >
                       Download